@@ -0,0 +1,59 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Helpers for provisioning namespace history and visibility archival."""
+
+import json
+
+ARCHIVAL_KINDS = ("history", "visibility")
+
+
+def parse_archival_config(output):
+    """Parse the archival and retention settings from `operator namespace describe -o json`.
+
+    Args:
+        output: JSON output of the describe command.
+
+    Returns:
+        Mapping with the archival state and URI per kind, and the retention.
+    """
+    config = (json.loads(output) if output else {}).get("config") or {}
+    settings = {"retention": config.get("workflowExecutionRetentionTtl", "")}
+    for kind in ARCHIVAL_KINDS:
+        state = config.get(f"{kind}ArchivalState", "")
+        settings[f"{kind}-state"] = "enabled" if state.endswith("ENABLED") else "disabled"
+        settings[f"{kind}-uri"] = config.get(f"{kind}ArchivalUri", "")
+    return settings
+
+
+def update_args(namespace, current, uris, retention=""):
+    """Build the `operator namespace update` arguments to enable archival.
+
+    Archival URIs cannot be changed once set on a namespace, so a namespace
+    already archiving to a different URI is rejected.
+
+    Args:
+        namespace: namespace to update.
+        current: current settings as returned by `parse_archival_config`.
+        uris: mapping of archival kind to the desired URI.
+        retention: optional retention period of closed executions, e.g. `72h`.
+
+    Returns:
+        List of arguments for the update command.
+
+    Raises:
+        ValueError: if an archival URI is already set to a different value.
+    """
+    args = ["operator", "namespace", "update", "--namespace", namespace]
+    for kind in ARCHIVAL_KINDS:
+        uri = uris.get(kind)
+        if not uri:
+            continue
+        if current[f"{kind}-uri"] and current[f"{kind}-uri"] != uri:
+            raise ValueError(f"{kind} archival URI is already set to {current[f'{kind}-uri']}")
+        args.extend([f"--{kind}-archival-state", "enabled"])
+        if not current[f"{kind}-uri"]:
+            args.extend([f"--{kind}-uri", uri])
+    if retention:
+        args.extend(["--retention", retention])
+    return args
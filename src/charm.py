@@ -9,12 +9,44 @@
 import functools
 import json
 import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
 
 from ops import main
 from ops.charm import CharmBase
 from ops.model import ActiveStatus, BlockedStatus, MaintenanceStatus, WaitingStatus
-
+from ops.pebble import ExecError
+
+from archival import parse_archival_config, update_args
+from concurrency import run_concurrently, run_timed
+from diagnostics import DIAGNOSTICS_COMMANDS, build_bundle
+from endpoints import (
+    HEALTH_CHECK_TIMEOUT,
+    EndpointPool,
+    is_connection_error,
+    parse_endpoints,
+)
+from exec_log import record_output
+from load_test import start_all, summarize
+from schema import (
+    SCHEMA_DIRS,
+    append_history,
+    available_versions,
+    plan_upgrade,
+    sanitize_error,
+    sql_tool_args,
+)
+from search_attributes import parse_attributes, parse_custom_attributes, plan_additions
 from state import State
+from task_queues import (
+    TASK_QUEUE_TYPES,
+    parse_description,
+    parse_namespaces,
+    parse_task_queues,
+    rank,
+)
 
 logger = logging.getLogger(__name__)
 WORKLOAD_VERSION = "1.23.1"
@@ -61,6 +93,8 @@ class TemporalAdminK8SCharm(CharmBase):
         super().__init__(*args)
         self._state = State(self.app, lambda: self.model.get_relation("peer"))
         self.name = "temporal-admin"
+        self._endpoint_pool = None
+        self._endpoint_pool_lock = threading.Lock()
 
         # Handle basic charm lifecycle.
         self.framework.observe(self.on.install, self._on_install)
@@ -73,6 +107,13 @@ class TemporalAdminK8SCharm(CharmBase):
         # Handle action
         self.framework.observe(self.on.cli_action, self._on_cli_action)
         self.framework.observe(self.on.setup_schema_action, self._on_setup_schema_action)
+        self.framework.observe(self.on.upgrade_schema_action, self._on_upgrade_schema_action)
+        self.framework.observe(self.on.schema_history_action, self._on_schema_history_action)
+        self.framework.observe(self.on.search_attributes_action, self._on_search_attributes_action)
+        self.framework.observe(self.on.load_test_action, self._on_load_test_action)
+        self.framework.observe(self.on.describe_task_queues_action, self._on_describe_task_queues_action)
+        self.framework.observe(self.on.collect_diagnostics_action, self._on_collect_diagnostics_action)
+        self.framework.observe(self.on.provision_archival_action, self._on_provision_archival_action)
 
     @log_event_handler
     def _on_install(self, event):
@@ -132,6 +173,7 @@ class TemporalAdminK8SCharm(CharmBase):
 
         self._state.database_connections = None
         self._state.is_initial_schema_ready = False
+        self._state.schema_versions = None
         self._setup_db_schemas(event)
 
     @log_event_handler
@@ -146,10 +188,8 @@ class TemporalAdminK8SCharm(CharmBase):
             event.fail("cannot connect to container")
             return
 
-        server_name = self.model.config["server-name"] or "temporal-k8s"
-        args = ["--address", f"{server_name}:7236", *event.params["args"].split()]
         try:
-            output = execute(container, "temporal", *args)
+            output = self._run_temporal(container, *event.params["args"].split())
         except Exception as err:
             event.fail(f"command failed: {err}")
             return
@@ -168,6 +208,533 @@ class TemporalAdminK8SCharm(CharmBase):
         except Exception as err:
             event.fail(err)
 
+    @log_event_handler
+    def _on_upgrade_schema_action(self, event):
+        """Upgrade the database schemas to the image's schema target step by step.
+
+        Args:
+            event: The event triggered when the action is triggered.
+        """
+        if not self.model.unit.is_leader():
+            event.fail("schema upgrades must be run on the leader unit")
+            return
+
+        container = self.unit.get_container(self.name)
+        if not container.can_connect():
+            event.fail("cannot connect to container")
+            return
+
+        if not self._state.is_ready() or not self._state.database_connections:
+            event.fail("database connections info not available")
+            return
+
+        max_steps = event.params["max-steps"]
+        if max_steps < 0:
+            event.fail("max-steps must not be negative")
+            return
+
+        results = {}
+        try:
+            for key, database_connection in self._state.database_connections.items():
+                current, target, steps = self._plan_schema_upgrade(container, key)
+                event.log(
+                    f"{key} schema: {current or 'unknown'} -> {target}, planned steps: {', '.join(steps) or 'none'}"
+                )
+                applied = []
+                if not event.params["dry-run"]:
+                    applied = self._upgrade_schema(container, key, database_connection, max_steps, log=event.log)
+                results[key] = {
+                    "from": str(current),
+                    "target": str(target),
+                    "applied": ",".join(f"{step['to']} ({step['duration']:.2f}s)" for step in applied),
+                    "remaining": ",".join(steps[len(applied) :]),
+                }
+        except Exception as err:
+            event.fail(f"schema upgrade failed: {err}")
+            return
+
+        paused = any(details["remaining"] for details in results.values())
+        result = "dry run" if event.params["dry-run"] else "paused" if paused else "schemas up to date"
+        event.set_results({"result": result, "workload-version": WORKLOAD_VERSION, **results})
+
+    @log_event_handler
+    def _on_schema_history_action(self, event):
+        """Show the recorded schema migration history.
+
+        Args:
+            event: The event triggered when the action is triggered.
+        """
+        if not self._state.is_ready():
+            event.fail("peer relation not ready")
+            return
+
+        if event.params["limit"] < 0:
+            event.fail("limit must not be negative")
+            return
+
+        history = self._state.schema_history or []
+        if event.params["store"]:
+            history = [step for step in history if step["store"] == event.params["store"]]
+        history = history[-event.params["limit"] :] if event.params["limit"] > 0 else history
+
+        durations = {}
+        for step in history:
+            if step["outcome"] == "succeeded":
+                durations[step["store"]] = durations.get(step["store"], 0) + step["duration"]
+
+        event.set_results(
+            {
+                "result": "command succeeded",
+                "steps": str(len(history)),
+                "total-duration": json.dumps({store: f"{duration:.2f}s" for store, duration in durations.items()}),
+                "history": json.dumps(history),
+            }
+        )
+
+    @log_event_handler
+    def _on_search_attributes_action(self, event):
+        """Add custom search attributes to a namespace declaratively.
+
+        The current attributes are read once and diffed against the desired
+        list, then all missing attributes are created in a single call.
+
+        Args:
+            event: The event triggered when the action is triggered.
+        """
+        container = self.unit.get_container(self.name)
+        if not container.can_connect():
+            event.fail("cannot connect to container")
+            return
+
+        namespace = event.params["namespace"]
+        try:
+            desired = parse_attributes(event.params["attributes"])
+            output = self._run_temporal(
+                container, "operator", "search-attribute", "list", "--namespace", namespace, "-o", "json"
+            )
+            current = parse_custom_attributes(output)
+        except Exception as err:
+            event.fail(f"command failed: {err}")
+            return
+
+        try:
+            additions, usage = plan_additions(current, desired)
+        except ValueError as err:
+            event.fail(str(err))
+            return
+
+        if additions and not event.params["dry-run"]:
+            args = ["operator", "search-attribute", "create", "--namespace", namespace]
+            for name, attr_type in additions.items():
+                args.extend(["--name", name, "--type", attr_type])
+            try:
+                self._run_temporal(container, *args)
+            except Exception as err:
+                event.fail(f"command failed: {err}")
+                return
+
+        event.set_results(
+            {
+                "result": "dry run" if event.params["dry-run"] else "command succeeded",
+                "added": ",".join(sorted(additions)),
+                "unchanged": ",".join(sorted(set(desired) - set(additions))),
+                "usage": json.dumps({attr_type: f"{used}/{capacity}" for attr_type, (used, capacity) in usage.items()}),
+            }
+        )
+
+    @log_event_handler
+    def _on_load_test_action(self, event):
+        """Start workflows at a fixed rate and report the achieved throughput.
+
+        Args:
+            event: The event triggered when the action is triggered.
+        """
+        container = self.unit.get_container(self.name)
+        if not container.can_connect():
+            event.fail("cannot connect to container")
+            return
+
+        count = event.params["count"]
+        concurrency = event.params["concurrency"]
+        rate = event.params["rate"]
+        if count < 1 or concurrency < 1 or rate < 0:
+            event.fail("count and concurrency must be positive and rate must not be negative")
+            return
+
+        run_id = uuid.uuid4().hex[:8]
+        args = [
+            "workflow",
+            "start",
+            "--namespace",
+            event.params["namespace"],
+            "--task-queue",
+            event.params["task-queue"],
+            "--type",
+            event.params["workflow-type"],
+            "--execution-timeout",
+            event.params["execution-timeout"],
+        ]
+
+        # Health check the frontends before the clock starts, so the first
+        # starts do not include them.
+        self._get_endpoint_pool(container)
+        event.log(f"starting {count} workflows at {rate or 'unlimited'}/s with concurrency {concurrency}")
+        started_at = time.monotonic()
+        schedule = [
+            (f"load-test-{run_id}-{index}", started_at + (index / rate if rate else 0)) for index in range(count)
+        ]
+        start = functools.partial(self._start_workflow, container, args)
+        latencies, errors = start_all(start, schedule, concurrency, event.log)
+        elapsed = time.monotonic() - started_at
+
+        results = summarize(latencies, len(errors), elapsed)
+        if errors:
+            results["first-error"] = str(errors[0])
+        event.set_results({"result": "load test completed", "run-id": run_id, **results})
+
+    def _start_workflow(self, container, args, workflow_id, scheduled_at):
+        """Start a workflow at its scheduled time and measure the start latency.
+
+        The command output is not logged, so the latency only covers running
+        the command.
+
+        Args:
+            container: Container to execute command in.
+            args: Arguments for `temporal workflow start`, without the workflow ID.
+            workflow_id: ID of the workflow to start.
+            scheduled_at: Monotonic time to start the workflow at.
+
+        Returns:
+            The start latency in seconds.
+        """
+        delay = scheduled_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        started_at = time.monotonic()
+        self._run_temporal(container, *args, "--workflow-id", workflow_id, spread=True, log_output=False)
+        return time.monotonic() - started_at
+
+    @log_event_handler
+    def _on_describe_task_queues_action(self, event):
+        """Describe task queues across namespaces and rank them by backlog.
+
+        Namespaces and their task queues are discovered unless given, and all
+        task queues are described concurrently with a bounded pool.
+
+        Args:
+            event: The event triggered when the action is triggered.
+        """
+        container = self.unit.get_container(self.name)
+        if not container.can_connect():
+            event.fail("cannot connect to container")
+            return
+
+        concurrency = event.params["concurrency"]
+        if concurrency < 1 or event.params["limit"] < 1 or event.params["discovery-limit"] < 1:
+            event.fail("concurrency, limit and discovery-limit must be positive")
+            return
+
+        try:
+            namespaces = _split(event.params["namespaces"]) or parse_namespaces(
+                self._run_temporal(container, "operator", "namespace", "list", "-o", "json")
+            )
+        except Exception as err:
+            event.fail(f"command failed: {err}")
+            return
+
+        task_queues = _split(event.params["task-queues"])
+        if task_queues:
+            targets = [(namespace, task_queue) for namespace in namespaces for task_queue in task_queues]
+        else:
+            targets = self._discover_task_queues(
+                container, namespaces, event.params["discovery-limit"], concurrency, event.log
+            )
+
+        event.log(f"describing {len(targets)} task queues in {len(namespaces)} namespaces")
+        entries, failures = self._describe_task_queues(container, targets, concurrency, event.log)
+
+        event.set_results(
+            {
+                "result": "command succeeded",
+                "namespaces": str(len(namespaces)),
+                "described": str(len(entries)),
+                "failed": str(failures),
+                "report": json.dumps(rank(entries)[: event.params["limit"]]),
+            }
+        )
+
+    def _discover_task_queues(self, container, namespaces, limit, concurrency, log):
+        """Discover the task queues of running executions in the given namespaces.
+
+        Args:
+            container: Container to execute commands in.
+            namespaces: Namespaces to discover task queues in.
+            limit: Maximum number of running executions listed per namespace.
+            concurrency: Maximum number of concurrent list calls.
+            log: Function used to report namespaces that could not be listed.
+
+        Returns:
+            List of (namespace, task queue) tuples.
+        """
+
+        def list_task_queues(namespace):
+            output = self._run_temporal(
+                container,
+                "workflow",
+                "list",
+                "--namespace",
+                namespace,
+                "--query",
+                "ExecutionStatus='Running'",
+                "--limit",
+                str(limit),
+                "-o",
+                "json",
+                spread=True,
+            )
+            return parse_task_queues(output)
+
+        targets = []
+        for namespace, found, error in run_concurrently(list_task_queues, namespaces, concurrency):
+            if error:
+                log(f"cannot list task queues of namespace {namespace}: {error}")
+                continue
+            targets.extend((namespace, task_queue) for task_queue in found)
+        return targets
+
+    def _describe_task_queues(self, container, targets, concurrency, log):
+        """Describe the workflow and activity task queues of the given targets concurrently.
+
+        Args:
+            container: Container to execute commands in.
+            targets: List of (namespace, task queue) tuples.
+            concurrency: Maximum number of concurrent describe calls.
+            log: Function used to report task queues that could not be described.
+
+        Returns:
+            Tuple of (described task queue entries, number of failed describes).
+        """
+
+        def describe(target):
+            namespace, task_queue, tq_type = target
+            output = self._run_temporal(
+                container,
+                "task-queue",
+                "describe",
+                "--namespace",
+                namespace,
+                "--task-queue",
+                task_queue,
+                "--task-queue-type",
+                tq_type,
+                "-o",
+                "json",
+                spread=True,
+            )
+            return parse_description(output)
+
+        items = [(namespace, task_queue, tq_type) for namespace, task_queue in targets for tq_type in TASK_QUEUE_TYPES]
+        entries = []
+        failures = 0
+        for (namespace, task_queue, tq_type), description, error in run_concurrently(describe, items, concurrency):
+            if error:
+                failures += 1
+                log(f"cannot describe {tq_type} task queue {task_queue} in {namespace}: {error}")
+                continue
+            entries.append({"namespace": namespace, "task-queue": task_queue, "type": tq_type, **description})
+        return entries, failures
+
+    @log_event_handler
+    def _on_collect_diagnostics_action(self, event):
+        """Collect read-only cluster diagnostics into a tarball in the container.
+
+        Args:
+            event: The event triggered when the action is triggered.
+        """
+        container = self.unit.get_container(self.name)
+        if not container.can_connect():
+            event.fail("cannot connect to container")
+            return
+
+        concurrency = event.params["concurrency"]
+        if concurrency < 1:
+            event.fail("concurrency must be positive")
+            return
+
+        commands = {
+            name: functools.partial(self._run_temporal, container, *args, spread=True)
+            for name, args in DIAGNOSTICS_COMMANDS.items()
+        }
+        commands["sql-tool-version"] = functools.partial(execute, container, "temporal-sql-tool", "--version")
+        collected = run_timed(commands, concurrency)
+
+        # Namespace details depend on the listed namespaces, so they are
+        # collected in a second concurrent round.
+        namespace_list, error, _ = collected["namespace-list"]
+        namespaces = parse_namespaces(namespace_list) if not error else []
+        commands = {
+            f"namespace-{namespace}": functools.partial(
+                self._run_temporal,
+                container,
+                "operator",
+                "namespace",
+                "describe",
+                "--namespace",
+                namespace,
+                "-o",
+                "json",
+                spread=True,
+            )
+            for namespace in namespaces
+        }
+        collected.update(run_timed(commands, concurrency))
+
+        bundle, summary = build_bundle(collected)
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        path = f"{event.params['output-dir'].rstrip('/')}/diagnostics-{timestamp}.tar.gz"
+        try:
+            container.push(path, bundle, make_dirs=True)
+        except Exception as err:
+            event.fail(f"cannot write diagnostics bundle: {err}")
+            return
+
+        failed = sorted(name for name, details in summary.items() if details["status"] == "failed")
+        event.set_results(
+            {
+                "result": "diagnostics collected",
+                "path": path,
+                "size": str(len(bundle)),
+                "failed": ",".join(failed),
+                "summary": json.dumps(summary),
+            }
+        )
+
+    @log_event_handler
+    def _on_provision_archival_action(self, event):
+        """Enable history and visibility archival on namespaces in bulk.
+
+        Args:
+            event: The event triggered when the action is triggered.
+        """
+        container = self.unit.get_container(self.name)
+        if not container.can_connect():
+            event.fail("cannot connect to container")
+            return
+
+        uris = {"history": event.params["history-uri"], "visibility": event.params["visibility-uri"]}
+        if not any(uris.values()):
+            event.fail("at least one of history-uri and visibility-uri must be set")
+            return
+
+        if event.params["concurrency"] < 1:
+            event.fail("concurrency must be positive")
+            return
+
+        try:
+            namespaces = _split(event.params["namespaces"]) or parse_namespaces(
+                self._run_temporal(container, "operator", "namespace", "list", "-o", "json")
+            )
+        except Exception as err:
+            event.fail(f"command failed: {err}")
+            return
+
+        def describe(namespace):
+            return parse_archival_config(
+                self._run_temporal(
+                    container, "operator", "namespace", "describe", "--namespace", namespace, "-o", "json", spread=True
+                )
+            )
+
+        def provision(namespace):
+            before = describe(namespace)
+            args = update_args(namespace, before, uris, event.params["retention"])
+            self._run_temporal(container, *args, spread=True)
+            return {"before": before, "after": describe(namespace)}
+
+        event.log(f"provisioning archival on {len(namespaces)} namespaces")
+        report = {}
+        failed = []
+        for namespace, result, error in run_concurrently(provision, namespaces, event.params["concurrency"]):
+            if error:
+                failed.append(namespace)
+                event.log(f"cannot provision archival on namespace {namespace}: {error}")
+                report[namespace] = {"error": str(error)}
+                continue
+            report[namespace] = result
+
+        if failed and len(failed) == len(namespaces):
+            event.fail(f"archival provisioning failed on all namespaces: {json.dumps(report)}")
+            return
+
+        event.set_results(
+            {
+                "result": "archival provisioned",
+                "provisioned": str(len(namespaces) - len(failed)),
+                "failed": ",".join(failed),
+                "report": json.dumps(report),
+            }
+        )
+
+    def _run_temporal(self, container, *args, spread=False, log_output=True):
+        """Run the temporal command line tool against a server frontend.
+
+        The command is sent to the healthy frontend endpoint with the lowest
+        latency. It is only retried on the next endpoint if it failed before
+        a connection was established, so a command is never sent twice to a
+        server that may have received it.
+
+        Args:
+            container: Container to execute command in.
+            args: Arguments for the temporal command line tool.
+            spread: Rotate between the healthy endpoints, to spread heavy
+                traffic across frontends.
+            log_output: Whether to log the output of the command.
+
+        Returns:
+            Output from executing the command.
+
+        Raises:
+            Exception: the error of the last endpoint tried, if the command
+                failed on all endpoints.
+        """
+        pool = self._get_endpoint_pool(container)
+        error = None
+        for endpoint in pool.candidates(spread=spread):
+            try:
+                return execute(container, "temporal", "--address", endpoint, *args, log_output=log_output)
+            except ExecError as err:
+                if not is_connection_error(err):
+                    raise
+                logger.warning(f"frontend {endpoint} unreachable, failing over: {err.stderr.strip()}")
+                pool.mark_failed(endpoint)
+                error = err
+        raise error
+
+    def _get_endpoint_pool(self, container):
+        """Get the frontend endpoint pool, health checking the endpoints once per hook.
+
+        Args:
+            container: Container to execute the health checks in.
+
+        Returns:
+            The endpoint pool.
+        """
+        with self._endpoint_pool_lock:
+            if self._endpoint_pool is None:
+                server_name = self.model.config["server-name"] or "temporal-k8s"
+                endpoints = parse_endpoints(self.model.config["frontend-endpoints"], server_name)
+                latencies = {endpoints[0]: 0.0}
+                if len(endpoints) > 1:
+                    latencies = {
+                        endpoint: latency
+                        for endpoint, latency, _ in run_concurrently(
+                            functools.partial(_check_endpoint, container), endpoints, len(endpoints)
+                        )
+                    }
+                    logger.debug(f"frontend health check latencies: {latencies}")
+                self._endpoint_pool = EndpointPool(latencies)
+            return self._endpoint_pool
+
     # flake8: noqa: C901
     def _setup_db_schemas(self, event):
         """Initialize the db schemas if db connections info is available.
@@ -194,61 +761,13 @@ class TemporalAdminK8SCharm(CharmBase):
             self.unit.status = BlockedStatus("admin:temporal relation: database connections info not available")
             return
 
-        schema_dirs = {
-            "db": "/etc/temporal/schema/postgresql/v12/temporal/versioned",
-            "visibility": "/etc/temporal/schema/postgresql/v12/visibility/versioned",
-        }
         for key, database_connection in self._state.database_connections.items():
             logger.info(f"initializing {key} schema")
             try:
-                command_args = [
-                    "--plugin",
-                    "postgres",
-                    "--endpoint",
-                    database_connection["host"],
-                    "--port",
-                    database_connection["port"],
-                    "--database",
-                    database_connection["dbname"],
-                    "--user",
-                    database_connection["user"],
-                    "--password",
-                    database_connection["password"],
-                    "setup-schema",
-                    "-v",
-                    "0.0",
-                ]
-
-                if database_connection.get("tls", False):
-                    command_args.insert(2, "--tls")
-                    command_args.insert(3, "--tls-disable-host-verification")
-
-                execute(container, "temporal-sql-tool", *command_args)
-
-                command_args = [
-                    "--plugin",
-                    "postgres",
-                    "--endpoint",
-                    database_connection["host"],
-                    "--port",
-                    database_connection["port"],
-                    "--database",
-                    database_connection["dbname"],
-                    "--user",
-                    database_connection["user"],
-                    "--password",
-                    database_connection["password"],
-                    "update-schema",
-                    "-d",
-                    schema_dirs[key],
-                ]
-
-                # Conditionally add the TLS flags
-                if database_connection.get("tls", False):
-                    command_args.insert(2, "--tls")
-                    command_args.insert(3, "--tls-disable-host-verification")
-
-                execute(container, "temporal-sql-tool", *command_args)
+                execute(
+                    container, "temporal-sql-tool", *sql_tool_args(database_connection), "setup-schema", "-v", "0.0"
+                )
+                self._upgrade_schema(container, key, database_connection)
             except Exception as e:
                 logger.error(f"Error setting up schema: {e}")
                 raise Exception from e
@@ -269,30 +788,202 @@ class TemporalAdminK8SCharm(CharmBase):
         self.unit.set_workload_version(WORKLOAD_VERSION)
         self.unit.status = ActiveStatus()
 
+    def _plan_schema_upgrade(self, container, key):
+        """Compute the schema upgrade path of a store to the image's schema target.
 
-def execute(container, command, *args):
+        Args:
+            container: Container holding the versioned schema directories.
+            key: Store to plan for, e.g. `db` or `visibility`.
+
+        Returns:
+            Tuple of (current version, target version, ordered versions to
+            apply). If the current version was never recorded, it is None and
+            the plan is a single step to the target.
+        """
+        versions = available_versions(entry.name for entry in container.list_files(SCHEMA_DIRS[key]))
+        current = (self._state.schema_versions or {}).get(key)
+        target = versions[-1] if versions else None
+        if current is None:
+            return None, target, [target] if target else []
+        return current, target, plan_upgrade(current, versions)
+
+    def _upgrade_schema(self, container, key, database_connection, max_steps=0, log=logger.info):
+        """Upgrade the schema of a store to the image's schema target one version at a time.
+
+        Each step is applied with its own `update-schema` call and recorded
+        before the next one starts, so an interrupted upgrade resumes from the
+        last applied version. If the current version was never recorded, the
+        store is upgraded to the target in a single call.
+
+        Args:
+            container: Container to execute command in.
+            key: Store to upgrade, e.g. `db` or `visibility`.
+            database_connection: Connection info of the store's database.
+            max_steps: Maximum number of steps to apply, or 0 for all.
+            log: Function used to report progress.
+
+        Returns:
+            List of applied steps with their durations.
+        """
+        current, target, steps = self._plan_schema_upgrade(container, key)
+        args = [*sql_tool_args(database_connection), "update-schema", "-d", SCHEMA_DIRS[key]]
+        if current is None:
+            return [self._apply_schema_step(container, key, args, None, target)]
+
+        applied = []
+        for version in steps[:max_steps] if max_steps else steps:
+            log(f"upgrading {key} schema from {current} to {version}")
+            step = self._apply_schema_step(container, key, [*args, "--version", version], current, version)
+            applied.append(step)
+            log(f"upgraded {key} schema to {version} in {step['duration']:.2f}s")
+            current = version
+        return applied
+
+    def _apply_schema_step(self, container, key, args, from_version, to_version):
+        """Run a single schema upgrade step and record it in the migration history.
+
+        Args:
+            container: Container to execute command in.
+            key: Store being upgraded.
+            args: Arguments for temporal-sql-tool.
+            from_version: Schema version before the step, or None if unknown.
+            to_version: Schema version the step upgrades to.
+
+        Returns:
+            The recorded step.
+
+        Raises:
+            Exception: if the step failed. The failure is recorded first, and
+                the error message never contains the database password.
+        """
+        self._verify_schema_step(container, key, to_version)
+        step = {
+            "store": key,
+            "from": from_version,
+            "to": to_version,
+            "started": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        }
+        started_at = time.monotonic()
+        try:
+            execute(container, "temporal-sql-tool", *args)
+        except Exception as err:
+            self._record_schema_history({**step, "duration": time.monotonic() - started_at, "outcome": "failed"})
+            raise Exception(f"{key} schema upgrade to {to_version} failed: {sanitize_error(err, args)}") from None
+
+        step.update({"duration": time.monotonic() - started_at, "outcome": "succeeded"})
+        self._record_schema_history(step)
+        self._record_schema_version(key, to_version)
+        return step
+
+    def _verify_schema_step(self, container, key, version):
+        """Verify that the image ships a consistent migration for a schema version.
+
+        Args:
+            container: Container holding the versioned schema directories.
+            key: Store being upgraded.
+            version: Schema version the step upgrades to.
+
+        Raises:
+            Exception: if the manifest of the version is missing or does not
+                match the version.
+        """
+        if version is None:
+            return
+        path = f"{SCHEMA_DIRS[key]}/v{version}/manifest.json"
+        try:
+            manifest = json.loads(container.pull(path).read())
+        except Exception as err:
+            raise Exception(f"{key} schema {version}: cannot read {path}: {err}") from None
+        if manifest.get("CurrVersion") != version:
+            raise Exception(f"{key} schema {version}: manifest is for version {manifest.get('CurrVersion')}")
+
+    def _record_schema_version(self, key, version):
+        """Record the schema version a store was upgraded to.
+
+        Args:
+            key: Store that was upgraded.
+            version: Schema version the store is at.
+        """
+        if version is None:
+            return
+        self._state.schema_versions = {**(self._state.schema_versions or {}), key: version}
+
+    def _record_schema_history(self, step):
+        """Append a schema upgrade step to the size-bounded migration history.
+
+        Args:
+            step: The step to record.
+        """
+        step = {**step, "duration": round(step["duration"], 3)}
+        self._state.schema_history = append_history(self._state.schema_history, step)
+
+
+def execute(container, command, *args, timeout=60, log_output=True):
     """Execute the given command in the given container.
 
-    Log the output and any warnings.
+    Log the output and any warnings. Only the head and tail of long output is
+    logged, warnings are rate limited across commands, and the full output of
+    truncated commands is written to a spill file in the container, of which
+    only the most recent ones are kept.
 
     Args:
         container: Container to execute command in.
         command: Command to be executed.
         args: Additional arguments needed for command execution.
+        timeout: Seconds after which the command is killed.
+        log_output: Whether to log the output and warnings.
 
     Returns:
         Output from executing the command.
     """
     cmd = [command] + list(args)
-    proc = container.exec(cmd, timeout=60)
+    proc = container.exec(cmd, timeout=timeout)
     output, warnings = proc.wait_output()
-    for line in output.splitlines():
-        logger.debug(f"{command}: {line.strip()}")
-    if warnings:
-        for line in warnings.splitlines():
-            logger.warning(f"{command}: {line.strip()}")
+    if log_output:
+        record_output(container, command, output, warnings)
     return output
 
 
+def _check_endpoint(container, endpoint):
+    """Health check a frontend endpoint.
+
+    Args:
+        container: Container to execute the health check in.
+        endpoint: Frontend endpoint to check.
+
+    Returns:
+        The latency of the health check in seconds, or None if it failed or
+        did not finish within HEALTH_CHECK_TIMEOUT.
+    """
+    started_at = time.monotonic()
+    try:
+        execute(
+            container,
+            "temporal",
+            "--address",
+            endpoint,
+            "operator",
+            "cluster",
+            "health",
+            timeout=HEALTH_CHECK_TIMEOUT,
+        )
+    except Exception as err:
+        logger.warning(f"frontend {endpoint} failed health check: {err}")
+        return None
+    return time.monotonic() - started_at
+
+
+def _split(value):
+    """Split a comma-separated action parameter into its non-empty items.
+
+    Args:
+        value: comma-separated string.
+
+    Returns:
+        List of stripped items.
+    """
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+
 if __name__ == "__main__":
     main.main(TemporalAdminK8SCharm)
@@ -0,0 +1,65 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Helpers for running commands concurrently."""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def run_concurrently(func, items, max_workers):
+    """Call the given function on each item using a bounded thread pool.
+
+    Args:
+        func: function to call with each item.
+        items: items to process.
+        max_workers: maximum number of concurrent calls.
+
+    Returns:
+        List of (item, result, error) tuples in the order of the items, where
+        exactly one of result and error is set.
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(func, item) for item in items]
+        for item, future in zip(items, futures):
+            try:
+                results.append((item, future.result(), None))
+            except Exception as err:
+                results.append((item, None, err))
+    return results
+
+
+def run_timed(commands, max_workers):
+    """Run commands concurrently and time each of them.
+
+    Args:
+        commands: mapping of name to a callable running the command.
+        max_workers: maximum number of concurrent commands.
+
+    Returns:
+        Mapping of name to an (output, error, duration in seconds) tuple,
+        where exactly one of output and error is set.
+    """
+
+    def timed(name):
+        """Run and time a single command.
+
+        Args:
+            name: name of the command to run.
+
+        Returns:
+            Tuple of (output, error, duration in seconds).
+        """
+        started_at = time.monotonic()
+        try:
+            output, error = commands[name](), None
+        except Exception as err:
+            output, error = None, err
+        return output, error, time.monotonic() - started_at
+
+    return {name: result for name, result, _ in run_concurrently(timed, commands, max_workers)}
@@ -0,0 +1,53 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Helpers for collecting diagnostics bundles."""
+
+import io
+import json
+import tarfile
+import time
+
+# Read-only temporal CLI queries collected by the collect-diagnostics action.
+DIAGNOSTICS_COMMANDS = {
+    "cluster-health": ("operator", "cluster", "health"),
+    "cluster-describe": ("operator", "cluster", "describe", "-o", "json"),
+    "cluster-system": ("operator", "cluster", "system", "-o", "json"),
+    "namespace-list": ("operator", "namespace", "list", "-o", "json"),
+    "search-attributes": ("operator", "search-attribute", "list", "-o", "json"),
+}
+
+
+def build_bundle(collected):
+    """Build a gzipped tarball of the collected diagnostics.
+
+    Args:
+        collected: mapping of name to an (output, error, duration) tuple.
+
+    Returns:
+        Tuple of (tarball content, summary of the status and duration of
+        every command).
+    """
+    summary = {}
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+        for name, (output, error, duration) in collected.items():
+            summary[name] = {"status": "failed" if error else "ok", "duration": f"{duration:.2f}s"}
+            _add_to_tar(tar, f"{name}.txt", output if not error else f"command failed: {error}")
+        _add_to_tar(tar, "summary.json", json.dumps(summary, indent=2))
+    return buffer.getvalue(), summary
+
+
+def _add_to_tar(tar, name, content):
+    """Add a text file with the given content to a tarball.
+
+    Args:
+        tar: open tarfile to add to.
+        name: name of the file in the tarball.
+        content: text content of the file.
+    """
+    data = content.encode()
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = int(time.time())
+    tar.addfile(info, io.BytesIO(data))
@@ -0,0 +1,119 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Helpers for pooling and failing over between Temporal frontend endpoints."""
+
+import itertools
+import threading
+
+from ops.pebble import ExecError
+
+FRONTEND_PORT = 7236
+
+# Seconds after which a frontend health check is abandoned and the endpoint
+# treated as unhealthy, so a hung frontend cannot stall the first command of
+# a hook.
+HEALTH_CHECK_TIMEOUT = 5
+
+# Fragments of temporal CLI errors raised before a connection to the endpoint
+# was established, so the command cannot have reached the server. Commands
+# failing this way are retried on another endpoint. Errors such as timeouts
+# or unavailability may happen after the server received the request and
+# are not retried, since many admin commands are not idempotent.
+CONNECTION_ERRORS = (
+    "connection refused",
+    "no such host",
+    "server misbehaving",
+    "temporary failure in name resolution",
+    "no route to host",
+    "network is unreachable",
+)
+
+
+def parse_endpoints(value, server_name):
+    """Parse the configured frontend endpoints.
+
+    Args:
+        value: comma-separated list of `host` or `host:port` endpoints.
+        server_name: name of the Temporal server, used if no endpoint is set.
+
+    Returns:
+        List of unique `host:port` endpoints, in configured order.
+    """
+    endpoints = []
+    for item in (value or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        endpoint = item if ":" in item else f"{item}:{FRONTEND_PORT}"
+        if endpoint not in endpoints:
+            endpoints.append(endpoint)
+    return endpoints or [f"{server_name}:{FRONTEND_PORT}"]
+
+
+def is_connection_error(err):
+    """Report whether a command failed before it could reach its endpoint.
+
+    Only the standard error of the command is inspected, as its arguments
+    may contain arbitrary text.
+
+    Args:
+        err: exception raised by the command.
+
+    Returns:
+        True if the command should be retried on another endpoint.
+    """
+    if not isinstance(err, ExecError):
+        return False
+    stderr = (err.stderr or "").lower()
+    return any(fragment in stderr for fragment in CONNECTION_ERRORS)
+
+
+class EndpointPool:
+    """Frontend endpoints ordered by health check latency.
+
+    Healthy endpoints are preferred over unhealthy ones, and endpoints that
+    fail with connection errors are skipped for the rest of the hook. The
+    pool is safe to share between threads.
+    """
+
+    def __init__(self, latencies):
+        """Construct.
+
+        Args:
+            latencies: mapping of endpoint to its health check latency in
+                seconds, or None if the health check failed.
+        """
+        healthy = sorted((e for e, latency in latencies.items() if latency is not None), key=latencies.get)
+        self._healthy = healthy
+        self._unhealthy = [e for e, latency in latencies.items() if latency is None]
+        self._failed = set()
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+
+    def candidates(self, spread=False):
+        """List the endpoints to try for a command, in order.
+
+        Args:
+            spread: rotate the healthy endpoints between calls instead of
+                always starting with the lowest latency one.
+
+        Returns:
+            List of endpoints.
+        """
+        with self._lock:
+            healthy = [e for e in self._healthy if e not in self._failed]
+            others = [e for e in self._healthy + self._unhealthy if e not in healthy]
+        if spread and healthy:
+            offset = next(self._counter) % len(healthy)
+            healthy = healthy[offset:] + healthy[:offset]
+        return healthy + others
+
+    def mark_failed(self, endpoint):
+        """Skip an endpoint that failed with a connection error.
+
+        Args:
+            endpoint: endpoint that failed.
+        """
+        with self._lock:
+            self._failed.add(endpoint)
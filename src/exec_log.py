@@ -0,0 +1,172 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Helpers for bounding the volume of logged command output."""
+
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+# Directory in the container holding the full output of commands whose
+# logged output was truncated, and the number of most recent files kept.
+SPILL_DIR = "/tmp/temporal-admin-exec"
+SPILL_KEEP = 20
+
+# Number of lines logged from the start and the end of each output stream of
+# a command. Lines in between are only kept in the spill file.
+HEAD_LINES = 50
+TAIL_LINES = 50
+
+# Warning lines logged across all commands of a hook: a burst of WARNING_BURST
+# lines, refilled at WARNING_RATE lines per second.
+WARNING_BURST = 50
+WARNING_RATE = 5.0
+
+
+def head_tail(lines, head=HEAD_LINES, tail=TAIL_LINES):
+    """Split lines into the retained head and tail and the number omitted.
+
+    Args:
+        lines: lines to split.
+        head: number of lines to keep from the start.
+        tail: number of lines to keep from the end.
+
+    Returns:
+        Tuple of (head lines, number of omitted lines, tail lines).
+    """
+    if len(lines) <= head + tail:
+        return lines, 0, []
+    return lines[:head], len(lines) - head - tail, lines[-tail:] if tail else []
+
+
+class RateLimiter:
+    """Token bucket limiting how many lines are logged per second.
+
+    The limiter is safe to share between threads.
+    """
+
+    def __init__(self, rate=WARNING_RATE, burst=WARNING_BURST, clock=time.monotonic):
+        """Construct.
+
+        Args:
+            rate: tokens added per second.
+            burst: maximum number of tokens.
+            clock: monotonic clock function.
+        """
+        self._rate = rate
+        self._burst = burst
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Consume a token if one is available.
+
+        Returns:
+            True if the line may be logged.
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self._burst, self._tokens + (now - self._updated_at) * self._rate)
+            self._updated_at = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+def record_output(container, command, output, warnings):
+    """Log the output and warnings of a command within the log volume limits.
+
+    Only the head and tail of long output is logged, warnings are rate
+    limited across commands, and the full output of truncated commands is
+    written to a spill file in the container, of which only the most recent
+    ones are kept.
+
+    Args:
+        container: Container the command was executed in.
+        command: Command that produced the output.
+        output: Standard output of the command.
+        warnings: Standard error of the command.
+    """
+    truncated = _log_output(logging.DEBUG, command, output)
+    if warnings:
+        truncated = _log_output(logging.WARNING, command, warnings) or truncated
+    if truncated:
+        _spill_output(container, command, output, warnings)
+
+
+def _log_output(level, command, text):
+    """Log the head and tail of a command's output stream.
+
+    Args:
+        level: Log level of the stream.
+        command: Command that produced the output.
+        text: Output of the stream.
+
+    Returns:
+        True if lines of the output were left out of the log.
+    """
+    if not text:
+        return False
+
+    head, omitted, tail = head_tail(text.splitlines())
+    suppressed = 0
+    for lines in (head, tail):
+        if lines is tail and omitted:
+            logger.log(level, "%s: ... %d lines omitted ...", command, omitted)
+        for line in lines:
+            if level >= logging.WARNING and not _warning_limiter.allow():
+                suppressed += 1
+                continue
+            logger.log(level, "%s: %s", command, line.strip())
+    if suppressed:
+        logger.warning("%s: %d warning lines suppressed by rate limit", command, suppressed)
+    return bool(omitted or suppressed)
+
+
+def _spill_output(container, command, output, warnings):
+    """Write the full output of a command to a spill file in the container.
+
+    Args:
+        container: Container the command was executed in.
+        command: Command that produced the output.
+        output: Standard output of the command.
+        warnings: Standard error of the command.
+    """
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    path = f"{SPILL_DIR}/{command}-{timestamp}-{uuid.uuid4().hex[:8]}.log"
+    try:
+        container.push(path, f"== stdout ==\n{output}\n== stderr ==\n{warnings or ''}", make_dirs=True)
+    except Exception as err:
+        logger.warning("%s: cannot write full output to %s: %s", command, path, err)
+        return
+    logger.info("%s: full output written to %s", command, path)
+    _prune_spill_files(container)
+
+
+def _prune_spill_files(container):
+    """Remove all but the most recent spill files from the container.
+
+    Args:
+        container: Container holding the spill files.
+    """
+    try:
+        files = sorted(container.list_files(SPILL_DIR), key=lambda f: (f.last_modified, f.name))
+    except Exception as err:
+        logger.warning("cannot list spill files in %s: %s", SPILL_DIR, err)
+        return
+    for stale in files[:-SPILL_KEEP]:
+        try:
+            container.remove_path(stale.path)
+        except Exception as err:
+            # Concurrent commands may prune the same file.
+            logger.debug("cannot remove spill file %s: %s", stale.path, err)
+
+
+_warning_limiter = RateLimiter()
@@ -0,0 +1,73 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Helpers for summarizing synthetic load test runs."""
+
+import math
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+def percentile(values, pct):
+    """Compute the nearest-rank percentile of the given values.
+
+    Args:
+        values: sorted list of values.
+        pct: percentile to compute, between 0 and 100.
+
+    Returns:
+        The percentile value, or 0.0 if there are no values.
+    """
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(values)))
+    return values[min(rank, len(values)) - 1]
+
+
+def summarize(latencies, errors, elapsed):
+    """Summarize the outcome of a load test run.
+
+    Args:
+        latencies: latencies in seconds of the successful workflow starts.
+        errors: number of failed workflow starts.
+        elapsed: wall clock duration of the run in seconds.
+
+    Returns:
+        Action results describing throughput, latency percentiles and errors.
+    """
+    latencies = sorted(latencies)
+    total = len(latencies) + errors
+    return {
+        "started": str(len(latencies)),
+        "errors": str(errors),
+        "error-rate": f"{errors / total if total else 0.0:.4f}",
+        "duration": f"{elapsed:.2f}s",
+        "starts-per-second": f"{len(latencies) / elapsed if elapsed > 0 else 0.0:.2f}",
+        "latency-ms": {f"p{pct}": f"{percentile(latencies, pct) * 1000:.1f}" for pct in (50, 90, 99)},
+    }
+
+
+def start_all(start, schedule, concurrency, log):
+    """Start workflows on schedule using a bounded thread pool.
+
+    Args:
+        start: function starting a workflow, called with its ID and the
+            monotonic time to start it at, and returning the start latency.
+        schedule: list of (workflow ID, monotonic time to start it at).
+        concurrency: maximum number of workflow starts in flight.
+        log: function used to report progress.
+
+    Returns:
+        Tuple of (latencies of the successful starts, errors of the failed ones).
+    """
+    latencies = []
+    errors = []
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(start, workflow_id, scheduled_at) for workflow_id, scheduled_at in schedule]
+        for done, future in enumerate(as_completed(futures), start=1):
+            try:
+                latencies.append(future.result())
+            except Exception as err:
+                errors.append(err)
+            if done % max(1, len(futures) // 10) == 0:
+                log(f"{done}/{len(futures)} workflow starts completed, {len(errors)} errors")
+    return latencies, errors
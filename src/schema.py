@@ -0,0 +1,136 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Helpers for planning versioned database schema upgrades."""
+
+from ops.pebble import ExecError
+
+# Maximum number of schema upgrade steps kept in the migration history. The
+# history is stored in the peer relation, so it must stay small.
+SCHEMA_HISTORY_LIMIT = 50
+
+SCHEMA_DIRS = {
+    "db": "/etc/temporal/schema/postgresql/v12/temporal/versioned",
+    "visibility": "/etc/temporal/schema/postgresql/v12/visibility/versioned",
+}
+
+
+def parse_version(version):
+    """Parse a schema version such as `1.10` or `v1.10` for comparison.
+
+    Args:
+        version: schema version string.
+
+    Returns:
+        Tuple of version components.
+
+    Raises:
+        ValueError: if the version is malformed.
+    """
+    parts = str(version).lstrip("v").split(".")
+    if not all(part.isdigit() for part in parts):
+        raise ValueError(f"malformed schema version {version!r}")
+    return tuple(int(part) for part in parts)
+
+
+def available_versions(names):
+    """List the schema versions shipped in a versioned schema directory.
+
+    Args:
+        names: names of the entries in the versioned schema directory,
+            e.g. `v1.0`, `v1.1`.
+
+    Returns:
+        Sorted list of schema versions, without the `v` prefix.
+    """
+    versions = []
+    for name in names:
+        if not name.startswith("v"):
+            continue
+        try:
+            parse_version(name)
+        except ValueError:
+            continue
+        versions.append(name[1:])
+    return sorted(versions, key=parse_version)
+
+
+def plan_upgrade(current, versions):
+    """Compute the ordered schema versions to apply to reach the latest one.
+
+    Args:
+        current: schema version the database is currently at.
+        versions: sorted schema versions shipped with the image.
+
+    Returns:
+        Ordered list of schema versions to apply, one per step.
+
+    Raises:
+        ValueError: if the database is at a version newer than the image
+            supports.
+    """
+    if versions and parse_version(current) > parse_version(versions[-1]):
+        raise ValueError(f"schema version {current} is newer than the image target {versions[-1]}")
+    return [version for version in versions if parse_version(version) > parse_version(current)]
+
+
+def append_history(history, step, limit=SCHEMA_HISTORY_LIMIT):
+    """Append a schema upgrade step to the migration history, dropping the oldest steps.
+
+    Args:
+        history: recorded steps, oldest first, or None.
+        step: step to append.
+        limit: maximum number of steps to keep.
+
+    Returns:
+        The new history.
+    """
+    return [*(history or []), step][-limit:]
+
+
+def sql_tool_args(database_connection):
+    """Build the temporal-sql-tool connection arguments for a database.
+
+    Args:
+        database_connection: Connection info of the database.
+
+    Returns:
+        List of connection arguments.
+    """
+    args = [
+        "--plugin",
+        "postgres",
+        "--endpoint",
+        database_connection["host"],
+        "--port",
+        database_connection["port"],
+        "--database",
+        database_connection["dbname"],
+        "--user",
+        database_connection["user"],
+        "--password",
+        database_connection["password"],
+    ]
+
+    # Conditionally add the TLS flags
+    if database_connection.get("tls", False):
+        args[2:2] = ["--tls", "--tls-disable-host-verification"]
+    return args
+
+
+def sanitize_error(err, args):
+    """Describe a failed command without leaking the password in its arguments.
+
+    Args:
+        err: Exception raised by the command.
+        args: Arguments of the command.
+
+    Returns:
+        The error description.
+    """
+    message = f"exit code {err.exit_code}: {(err.stderr or '').strip()}" if isinstance(err, ExecError) else str(err)
+    if "--password" in args:
+        password = args[args.index("--password") + 1]
+        if password:
+            message = message.replace(password, "***")
+    return message
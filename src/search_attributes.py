@@ -0,0 +1,149 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Helpers for declarative management of custom search attributes."""
+
+import json
+
+# SQL visibility (postgresql/v12) stores custom search attributes in a fixed
+# set of pre-allocated columns per type, each of which ships with its own
+# index. Adding an attribute maps it to a free column, so capacity is bounded
+# by the number of columns available for its type.
+SQL_VISIBILITY_SLOTS = {
+    "Bool": 3,
+    "Datetime": 3,
+    "Double": 3,
+    "Int": 3,
+    "Keyword": 10,
+    "KeywordList": 3,
+    "Text": 3,
+}
+
+_TYPES_BY_KEY = {t.lower(): t for t in SQL_VISIBILITY_SLOTS}
+
+
+def normalize_type(value):
+    """Normalize a search attribute type to its CLI name.
+
+    Accepts both CLI names (e.g. `Keyword`) and API enum names
+    (e.g. `INDEXED_VALUE_TYPE_KEYWORD_LIST`).
+
+    Args:
+        value: search attribute type.
+
+    Returns:
+        The normalized type name.
+
+    Raises:
+        ValueError: if the type is not a known search attribute type.
+    """
+    key = str(value).strip().lower()
+    key = key.removeprefix("indexed_value_type_").replace("_", "")
+    if key not in _TYPES_BY_KEY:
+        raise ValueError(f"unknown search attribute type {value!r}")
+    return _TYPES_BY_KEY[key]
+
+
+def parse_attributes(spec):
+    """Parse a comma-separated list of `name=Type` pairs.
+
+    Args:
+        spec: desired search attributes, e.g. `CustomerId=Keyword,Amount=Double`.
+
+    Returns:
+        Mapping of attribute name to normalized type.
+
+    Raises:
+        ValueError: if the specification is malformed.
+    """
+    attributes = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, sep, attr_type = item.partition("=")
+        name = name.strip()
+        if not sep or not name:
+            raise ValueError(f"invalid search attribute {item!r}, expected name=Type")
+        if name in attributes:
+            raise ValueError(f"duplicate search attribute {name!r}")
+        attributes[name] = normalize_type(attr_type)
+    return attributes
+
+
+def parse_custom_attributes(output):
+    """Parse the custom attributes from `operator search-attribute list -o json`.
+
+    Args:
+        output: JSON output of the list command.
+
+    Returns:
+        Mapping of custom attribute name to normalized type.
+    """
+    data = json.loads(output) if output else {}
+    custom = data.get("customAttributes") or {}
+    return {name: normalize_type(attr_type) for name, attr_type in custom.items()}
+
+
+def diff_attributes(current, desired):
+    """Compare the current and desired custom search attributes.
+
+    Args:
+        current: mapping of existing attribute name to type.
+        desired: mapping of desired attribute name to type.
+
+    Returns:
+        Tuple of (additions, conflicts). Additions map new attribute names to
+        their type, conflicts map names that exist with a different type to
+        a `(current, desired)` tuple.
+    """
+    additions = {}
+    conflicts = {}
+    for name, attr_type in desired.items():
+        if name not in current:
+            additions[name] = attr_type
+        elif current[name] != attr_type:
+            conflicts[name] = (current[name], attr_type)
+    return additions, conflicts
+
+
+def slot_usage(attributes):
+    """Count the visibility columns used per search attribute type.
+
+    Args:
+        attributes: mapping of attribute name to type.
+
+    Returns:
+        Mapping of type to a `(used, capacity)` tuple.
+    """
+    usage = {attr_type: 0 for attr_type in SQL_VISIBILITY_SLOTS}
+    for attr_type in attributes.values():
+        usage[attr_type] += 1
+    return {attr_type: (used, SQL_VISIBILITY_SLOTS[attr_type]) for attr_type, used in usage.items()}
+
+
+def plan_additions(current, desired):
+    """Compute the search attributes to add and check they can be added.
+
+    Args:
+        current: mapping of existing attribute name to type.
+        desired: mapping of desired attribute name to type.
+
+    Returns:
+        Tuple of (additions, usage), as returned by `diff_attributes` and
+        `slot_usage` for the attributes after the additions.
+
+    Raises:
+        ValueError: if desired attributes exist with a different type, or if
+            there are not enough visibility columns for the additions.
+    """
+    additions, conflicts = diff_attributes(current, desired)
+    if conflicts:
+        details = ", ".join(f"{name} is {old}, not {new}" for name, (old, new) in sorted(conflicts.items()))
+        raise ValueError(f"search attributes exist with a different type: {details}")
+
+    usage = slot_usage({**current, **additions})
+    exhausted = [attr_type for attr_type, (used, capacity) in usage.items() if used > capacity]
+    if exhausted:
+        raise ValueError(f"not enough visibility columns for type(s): {', '.join(sorted(exhausted))}")
+    return additions, usage
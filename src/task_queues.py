@@ -0,0 +1,104 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Helpers for inspecting task queue backlogs and pollers."""
+
+import json
+
+TASK_QUEUE_TYPES = ("workflow", "activity")
+
+
+def parse_json_records(output):
+    """Parse JSON output of the temporal CLI into a list of records.
+
+    List commands print either a JSON array or one JSON object per line.
+
+    Args:
+        output: JSON output of a temporal CLI command.
+
+    Returns:
+        List of decoded records.
+    """
+    output = (output or "").strip()
+    if not output:
+        return []
+    try:
+        data = json.loads(output)
+    except json.JSONDecodeError:
+        return [json.loads(line) for line in output.splitlines() if line.strip()]
+    return data if isinstance(data, list) else [data]
+
+
+def parse_namespaces(output):
+    """Parse the namespace names from `operator namespace list -o json`.
+
+    Args:
+        output: JSON output of the list command.
+
+    Returns:
+        Sorted list of namespace names.
+    """
+    return sorted({record["namespaceInfo"]["name"] for record in parse_json_records(output)})
+
+
+def parse_task_queues(output):
+    """Parse the task queues used by the executions from `workflow list -o json`.
+
+    Args:
+        output: JSON output of the list command.
+
+    Returns:
+        Sorted list of task queue names.
+    """
+    return sorted({record["taskQueue"] for record in parse_json_records(output) if record.get("taskQueue")})
+
+
+def _parse_duration(value):
+    """Parse a protobuf JSON duration such as `12.5s` into seconds.
+
+    Args:
+        value: duration string.
+
+    Returns:
+        Duration in seconds.
+    """
+    return float(str(value or "0s").rstrip("s") or 0)
+
+
+def parse_description(output):
+    """Parse the backlog and poller details from `task-queue describe -o json`.
+
+    Both the legacy `taskQueueStatus` and the newer `stats` fields are
+    understood; fields missing from the server response are reported as zero.
+
+    Args:
+        output: JSON output of the describe command.
+
+    Returns:
+        Mapping with the poller count, backlog size, backlog age in seconds
+        and dispatch rate.
+    """
+    data = json.loads(output) if output else {}
+    status = data.get("taskQueueStatus") or {}
+    stats = data.get("stats") or {}
+    return {
+        "pollers": len(data.get("pollers") or []),
+        "backlog": int(stats.get("approximateBacklogCount", status.get("backlogCountHint", 0))),
+        "backlog-age": _parse_duration(stats.get("approximateBacklogAge")),
+        "dispatch-rate": float(stats.get("tasksDispatchRate", status.get("ratePerSecond", 0))),
+    }
+
+
+def rank(entries):
+    """Rank task queue entries, most backed up first.
+
+    Entries are ordered by backlog age, then backlog size, then by fewest
+    pollers.
+
+    Args:
+        entries: list of parsed task queue descriptions.
+
+    Returns:
+        The ranked list of entries.
+    """
+    return sorted(entries, key=lambda entry: (-entry["backlog-age"], -entry["backlog"], entry["pollers"]))
@@ -32,8 +32,23 @@ def context(temporal_admin_charm):
 
 
 @pytest.fixture(scope="function")
-def temporal_admin_container():
-    return ops.testing.Container("temporal-admin", can_connect=True)
+def schema_versions():
+    return ["0.0", "1.0", "1.1", "1.2"]
+
+
+@pytest.fixture(scope="function")
+def temporal_admin_container(tmp_path, schema_versions):
+    for store in ("temporal", "visibility"):
+        for version in schema_versions:
+            version_dir = tmp_path / "postgresql" / "v12" / store / "versioned" / f"v{version}"
+            version_dir.mkdir(parents=True)
+            (version_dir / "manifest.json").write_text(json.dumps({"CurrVersion": version}))
+
+    return ops.testing.Container(
+        "temporal-admin",
+        can_connect=True,
+        mounts={"schema": ops.testing.Mount(location="/etc/temporal/schema", source=tmp_path)},
+    )
 
 
 @pytest.fixture
@@ -1,13 +1,21 @@
 # Copyright 2023 Canonical Ltd.
 # See LICENSE file for licensing details.
 
+import dataclasses
+import json
 import logging
+import os
+import tarfile
+import time
 import unittest.mock
 
 import ops
 import ops.testing
 import pytest
 
+import charm
+import exec_log
+
 logger = logging.getLogger(__name__)
 
 
@@ -56,3 +64,530 @@ def test_ready(context, state, temporal_admin_container):
         assert state_out.get_container("temporal-admin").plan.to_dict() == {}
 
         assert execute.call_count == 4
+
+        peer = state_out.get_relations("peer")[0]
+        assert json.loads(peer.local_app_data["schema_versions"]) == {"db": "1.2", "visibility": "1.2"}
+
+
+def test_upgrade_schema(context, temporal_admin_container, peer_relation, admin_relation):
+    local_app_data = {**peer_relation.local_app_data, "schema_versions": json.dumps({"db": "1.0", "visibility": "1.2"})}
+    state = ops.testing.State(
+        leader=True,
+        containers=[temporal_admin_container],
+        relations=[dataclasses.replace(peer_relation, local_app_data=local_app_data), admin_relation],
+    )
+
+    with unittest.mock.patch("charm.execute") as execute:
+        state_out = context.run(context.on.action("upgrade-schema", params={"max-steps": 1, "dry-run": False}), state)
+
+        assert execute.call_count == 1
+        assert execute.call_args.args[-2:] == ("--version", "1.1")
+        assert context.action_results["result"] == "paused"
+        assert context.action_results["db"]["remaining"] == "1.2"
+        assert context.action_results["visibility"]["applied"] == ""
+
+        peer = state_out.get_relations("peer")[0]
+        assert json.loads(peer.local_app_data["schema_versions"]) == {"db": "1.1", "visibility": "1.2"}
+
+
+def test_search_attributes(context, state):
+    current = json.dumps({"customAttributes": {"CustomerId": "INDEXED_VALUE_TYPE_KEYWORD"}})
+    with unittest.mock.patch("charm.execute", side_effect=[current, ""]) as execute:
+        context.run(
+            context.on.action(
+                "search-attributes",
+                params={"attributes": "CustomerId=Keyword,Amount=Double", "namespace": "default", "dry-run": False},
+            ),
+            state,
+        )
+
+        assert execute.call_count == 2
+        assert execute.call_args.args[-4:] == ("--name", "Amount", "--type", "Double")
+        assert context.action_results["added"] == "Amount"
+        assert context.action_results["unchanged"] == "CustomerId"
+        assert json.loads(context.action_results["usage"])["Keyword"] == "1/10"
+
+
+def test_search_attributes_type_conflict(context, state):
+    current = json.dumps({"customAttributes": {"Amount": "INDEXED_VALUE_TYPE_INT"}})
+    with unittest.mock.patch("charm.execute", return_value=current) as execute:
+        with pytest.raises(ops.testing.ActionFailed, match="Amount is Int, not Double"):
+            context.run(
+                context.on.action(
+                    "search-attributes",
+                    params={"attributes": "Amount=Double", "namespace": "default", "dry-run": False},
+                ),
+                state,
+            )
+
+        assert execute.call_count == 1
+
+
+def test_load_test(context, state):
+    def fake_server(container, command, *args, log_output=True):
+        """Stand in for a Temporal dev server, rejecting one in ten starts.
+
+        Args:
+            container: container the command runs in.
+            command: command to run.
+            args: command arguments.
+            log_output: whether the command output is logged.
+
+        Returns:
+            The command output.
+
+        Raises:
+            RuntimeError: for every tenth workflow start.
+        """
+        assert not log_output
+        if int(args[-1].rsplit("-", 1)[1]) % 10 == 9:
+            raise RuntimeError("resource exhausted")
+        return "Running execution"
+
+    params = {
+        "count": 20,
+        "concurrency": 4,
+        "rate": 0,
+        "namespace": "default",
+        "task-queue": "load-test",
+        "workflow-type": "load-test",
+        "execution-timeout": "1m",
+    }
+    with unittest.mock.patch("charm.execute", side_effect=fake_server) as execute:
+        context.run(context.on.action("load-test", params=params), state)
+
+        assert execute.call_count == 20
+        assert context.action_results["started"] == "18"
+        assert context.action_results["errors"] == "2"
+        assert context.action_results["error-rate"] == "0.1000"
+        assert context.action_results["first-error"] == "resource exhausted"
+        assert set(context.action_results["latency-ms"]) == {"p50", "p90", "p99"}
+
+
+def test_describe_task_queues(context, state):
+    def fake_server(container, command, *args, **kwargs):
+        """Stand in for a Temporal server with two namespaces, each with one task queue.
+
+        Args:
+            container: container the command runs in.
+            command: command to run.
+            args: command arguments.
+            kwargs: execute keyword arguments.
+
+        Returns:
+            The command output.
+        """
+        if "namespace" in args and "list" in args:
+            return json.dumps([{"namespaceInfo": {"name": "default"}}, {"namespaceInfo": {"name": "billing"}}])
+        if "workflow" in args and "list" in args:
+            assert args[args.index("--limit") + 1] == "500"
+            namespace = args[args.index("--namespace") + 1]
+            return "\n".join(json.dumps({"taskQueue": f"{namespace}-tq"}) for _ in range(2))
+        if args[args.index("--task-queue") + 1] == "billing-tq" and "activity" in args:
+            return json.dumps(
+                {"pollers": [{}], "stats": {"approximateBacklogCount": "42", "approximateBacklogAge": "90s"}}
+            )
+        return json.dumps({"pollers": [{}, {}], "taskQueueStatus": {"backlogCountHint": "3", "ratePerSecond": 100}})
+
+    params = {"namespaces": "", "task-queues": "", "concurrency": 4, "limit": 20, "discovery-limit": 500}
+    with unittest.mock.patch("charm.execute", side_effect=fake_server) as execute:
+        context.run(context.on.action("describe-task-queues", params=params), state)
+
+        # One namespace list, two task queue discoveries and four describes.
+        assert execute.call_count == 7
+        report = json.loads(context.action_results["report"])
+        assert len(report) == 4
+        assert report[0] == {
+            "namespace": "billing",
+            "task-queue": "billing-tq",
+            "type": "activity",
+            "pollers": 1,
+            "backlog": 42,
+            "backlog-age": 90.0,
+            "dispatch-rate": 0.0,
+        }
+        assert report[1]["backlog"] == 3
+
+
+def test_collect_diagnostics(context, state):
+    def fake_server(container, command, *args, **kwargs):
+        """Stand in for a Temporal server with one namespace and a failing health check.
+
+        Args:
+            container: container the command runs in.
+            command: command to run.
+            args: command arguments.
+            kwargs: execute keyword arguments.
+
+        Returns:
+            The command output.
+
+        Raises:
+            RuntimeError: for the cluster health check.
+        """
+        if "health" in args:
+            raise RuntimeError("connection refused")
+        if "list" in args and "namespace" in args:
+            return json.dumps([{"namespaceInfo": {"name": "default"}}])
+        return f"{command} {' '.join(args)}"
+
+    params = {"output-dir": "/tmp/diagnostics", "concurrency": 4}
+    with unittest.mock.patch("charm.execute", side_effect=fake_server) as execute:
+        state_out = context.run(context.on.action("collect-diagnostics", params=params), state)
+
+        # Five temporal queries, the sql tool version and one namespace describe.
+        assert execute.call_count == 7
+        assert context.action_results["failed"] == "cluster-health"
+        path = context.action_results["path"]
+        assert path.startswith("/tmp/diagnostics/diagnostics-")
+
+        filesystem = state_out.get_container("temporal-admin").get_filesystem(context)
+        with tarfile.open(filesystem / path.lstrip("/")) as tar:
+            names = set(tar.getnames())
+            assert {"summary.json", "cluster-health.txt", "namespace-default.txt"} <= names
+            summary = json.load(tar.extractfile("summary.json"))
+            assert summary["cluster-health"]["status"] == "failed"
+            assert summary["sql-tool-version"]["status"] == "ok"
+
+
+def test_provision_archival(context, state):
+    configs = {
+        "default": {"historyArchivalState": "ARCHIVAL_STATE_DISABLED", "workflowExecutionRetentionTtl": "259200s"},
+        "billing": {"historyArchivalState": "ARCHIVAL_STATE_ENABLED", "historyArchivalUri": "file:///elsewhere"},
+    }
+
+    def fake_server(container, command, *args, **kwargs):
+        """Stand in for a Temporal server holding the namespace configs.
+
+        Args:
+            container: container the command runs in.
+            command: command to run.
+            args: command arguments.
+            kwargs: execute keyword arguments.
+
+        Returns:
+            The command output.
+        """
+        namespace = args[args.index("--namespace") + 1]
+        if "update" in args:
+            configs[namespace]["historyArchivalState"] = "ARCHIVAL_STATE_ENABLED"
+            configs[namespace]["historyArchivalUri"] = args[args.index("--history-uri") + 1]
+            return ""
+        return json.dumps({"config": configs[namespace]})
+
+    params = {
+        "namespaces": "default,billing",
+        "history-uri": "file:///tmp/temporal_archival/history",
+        "visibility-uri": "",
+        "retention": "",
+        "concurrency": 2,
+    }
+    with unittest.mock.patch("charm.execute", side_effect=fake_server):
+        context.run(context.on.action("provision-archival", params=params), state)
+
+        assert context.action_results["provisioned"] == "1"
+        assert context.action_results["failed"] == "billing"
+        report = json.loads(context.action_results["report"])
+        assert report["default"]["before"]["history-state"] == "disabled"
+        assert report["default"]["after"]["history-state"] == "enabled"
+        assert report["default"]["after"]["history-uri"] == "file:///tmp/temporal_archival/history"
+        assert "already set" in report["billing"]["error"]
+
+
+def test_cli_fails_over_between_frontends(context, state):
+    state = dataclasses.replace(state, config={"frontend-endpoints": "frontend-0,frontend-1:7233,frontend-2"})
+    calls = []
+
+    def fake_server(container, command, *args, **kwargs):
+        """Stand in for three frontends: a hung one, an unknown host and a healthy one.
+
+        Args:
+            container: container the command runs in.
+            command: command to run.
+            args: command arguments.
+            kwargs: execute keyword arguments.
+
+        Returns:
+            The command output.
+
+        Raises:
+            TimeoutError: for the health check of frontend-2.
+            ExecError: for commands sent to frontend-1.
+        """
+        address = args[args.index("--address") + 1]
+        calls.append((address, args[2:], kwargs))
+        if address == "frontend-2:7236":
+            raise ops.pebble.TimeoutError("timed out waiting for health check")
+        if "health" in args:
+            # frontend-0 answers health checks slower than frontend-1.
+            time.sleep(0.05 if address == "frontend-0:7236" else 0)
+            return "SERVING"
+        if address == "frontend-1:7233":
+            raise ops.pebble.ExecError([command, *args], 1, "", "dial tcp: lookup frontend-1: no such host")
+        return "Namespace default successfully registered"
+
+    with unittest.mock.patch("charm.execute", side_effect=fake_server):
+        context.run(context.on.action("cli", params={"args": "operator namespace create --namespace default"}), state)
+
+        assert context.action_results["output"] == "Namespace default successfully registered"
+        commands = [address for address, args, _ in calls if "health" not in args]
+        assert commands == ["frontend-1:7233", "frontend-0:7236"]
+        health_checks = [kwargs for _, args, kwargs in calls if "health" in args]
+        assert len(health_checks) == 3
+        assert all(kwargs["timeout"] == charm.HEALTH_CHECK_TIMEOUT for kwargs in health_checks)
+
+
+@pytest.mark.parametrize(
+    "args, stderr",
+    [
+        ("workflow terminate --query WorkflowType='unavailable'", "context deadline exceeded"),
+        ("operator namespace create --namespace default", "rpc error: code = Unavailable"),
+        ("workflow list --query WorkflowType='connection refused'", "invalid query"),
+    ],
+)
+def test_cli_does_not_fail_over_after_connecting(context, state, args, stderr):
+    state = dataclasses.replace(state, config={"frontend-endpoints": "frontend-0,frontend-1"})
+
+    def fake_server(container, command, *argv, **kwargs):
+        """Stand in for healthy frontends failing the command after connecting.
+
+        Args:
+            container: container the command runs in.
+            command: command to run.
+            argv: command arguments.
+            kwargs: execute keyword arguments.
+
+        Returns:
+            The health check output.
+
+        Raises:
+            ExecError: for every command but the health check.
+        """
+        if "health" in argv:
+            return "SERVING"
+        raise ops.pebble.ExecError([command, *argv], 1, "", stderr)
+
+    with unittest.mock.patch("charm.execute", side_effect=fake_server) as execute:
+        with pytest.raises(ops.testing.ActionFailed):
+            context.run(context.on.action("cli", params={"args": args}), state)
+
+        # Two health checks and a single attempt of the command.
+        assert execute.call_count == 3
+
+
+def test_cli_does_not_retry_command_errors(context, state):
+    state = dataclasses.replace(state, config={"frontend-endpoints": "frontend-0,frontend-1"})
+
+    def fake_server(container, command, *args, **kwargs):
+        """Stand in for healthy frontends rejecting the command.
+
+        Args:
+            container: container the command runs in.
+            command: command to run.
+            args: command arguments.
+            kwargs: execute keyword arguments.
+
+        Returns:
+            The health check output.
+
+        Raises:
+            RuntimeError: for every command but the health check.
+        """
+        if "health" in args:
+            return "SERVING"
+        raise RuntimeError("Namespace default already exists")
+
+    with unittest.mock.patch("charm.execute", side_effect=fake_server) as execute:
+        with pytest.raises(ops.testing.ActionFailed, match="already exists"):
+            context.run(
+                context.on.action("cli", params={"args": "operator namespace create --namespace default"}), state
+            )
+
+        # Two health checks and a single attempt of the command.
+        assert execute.call_count == 3
+
+
+def test_schema_history(context, temporal_admin_container, peer_relation, admin_relation):
+    local_app_data = {**peer_relation.local_app_data, "schema_versions": json.dumps({"db": "1.0", "visibility": "1.2"})}
+    state = ops.testing.State(
+        leader=True,
+        containers=[temporal_admin_container],
+        relations=[dataclasses.replace(peer_relation, local_app_data=local_app_data), admin_relation],
+    )
+
+    def fake_sql_tool(container, command, *args):
+        """Stand in for temporal-sql-tool failing the upgrade to 1.2.
+
+        Args:
+            container: container the command runs in.
+            command: command to run.
+            args: command arguments.
+
+        Returns:
+            The command output.
+
+        Raises:
+            RuntimeError: for the upgrade to 1.2.
+        """
+        if args[-1] == "1.2":
+            raise RuntimeError("migration failed")
+        return ""
+
+    with unittest.mock.patch("charm.execute", side_effect=fake_sql_tool):
+        with pytest.raises(ops.testing.ActionFailed, match="migration failed") as failure:
+            context.run(context.on.action("upgrade-schema", params={"max-steps": 0, "dry-run": False}), state)
+
+    state_out = context.run(
+        context.on.action("schema-history", params={"store": "db", "limit": 20}), failure.value.state
+    )
+
+    history = json.loads(context.action_results["history"])
+    assert [(step["from"], step["to"], step["outcome"]) for step in history] == [
+        ("1.0", "1.1", "succeeded"),
+        ("1.1", "1.2", "failed"),
+    ]
+    assert context.action_results["steps"] == "2"
+    assert set(json.loads(context.action_results["total-duration"])) == {"db"}
+
+    peer = state_out.get_relations("peer")[0]
+    assert json.loads(peer.local_app_data["schema_versions"]) == {"db": "1.1", "visibility": "1.2"}
+
+
+def test_cli_output_logging_is_bounded(context, state, temporal_admin_container, caplog):
+    stdout = "".join(f"line {i}\n" for i in range(1000))
+    container = dataclasses.replace(
+        temporal_admin_container, execs={ops.testing.Exec(["temporal"], stdout=stdout, stderr="deprecated flag\n")}
+    )
+    state = dataclasses.replace(state, containers=[container])
+
+    caplog.set_level(logging.DEBUG, logger="exec_log")
+    state_out = context.run(context.on.action("cli", params={"args": "workflow list"}), state)
+
+    assert context.action_results["output"] == stdout
+    lines = [record.getMessage() for record in caplog.records if record.getMessage().startswith("temporal: ")]
+    assert "temporal: line 0" in lines
+    assert "temporal: line 999" in lines
+    assert "temporal: line 500" not in lines
+    assert "temporal: ... 900 lines omitted ..." in lines
+    assert "temporal: deprecated flag" in lines
+
+    spill = next(record for record in caplog.records if "full output written to" in record.getMessage())
+    path = spill.getMessage().rsplit(" ", 1)[1]
+    filesystem = state_out.get_container("temporal-admin").get_filesystem(context)
+    content = (filesystem / path.lstrip("/")).read_text()
+    assert "line 500\n" in content
+    assert "deprecated flag" in content
+
+
+def test_upgrade_schema_failure_does_not_leak_password(
+    context, temporal_admin_container, peer_relation, admin_relation
+):
+    local_app_data = {**peer_relation.local_app_data, "schema_versions": json.dumps({"db": "1.0", "visibility": "1.2"})}
+    state = ops.testing.State(
+        leader=True,
+        containers=[temporal_admin_container],
+        relations=[dataclasses.replace(peer_relation, local_app_data=local_app_data), admin_relation],
+    )
+
+    def fake_sql_tool(container, command, *args):
+        """Stand in for temporal-sql-tool failing to authenticate.
+
+        Args:
+            container: container the command runs in.
+            command: command to run.
+            args: command arguments, including the database password.
+
+        Raises:
+            ExecError: always.
+        """
+        raise ops.pebble.ExecError([command, *args], 1, "", "pq: password authentication failed\n")
+
+    with unittest.mock.patch("charm.execute", side_effect=fake_sql_tool):
+        with pytest.raises(ops.testing.ActionFailed) as failure:
+            context.run(context.on.action("upgrade-schema", params={"max-steps": 0, "dry-run": False}), state)
+
+    assert "inner-light" not in failure.value.message
+    assert "db schema upgrade to 1.1 failed: exit code 1: pq: password authentication failed" in failure.value.message
+
+
+def test_upgrade_schema_rejects_negative_max_steps(context, state):
+    with unittest.mock.patch("charm.execute") as execute:
+        with pytest.raises(ops.testing.ActionFailed, match="max-steps must not be negative"):
+            context.run(context.on.action("upgrade-schema", params={"max-steps": -1, "dry-run": False}), state)
+
+        assert execute.call_count == 0
+
+
+def test_upgrade_schema_dry_run_without_recorded_version(context, state):
+    with unittest.mock.patch("charm.execute") as execute:
+        context.run(context.on.action("upgrade-schema", params={"max-steps": 0, "dry-run": True}), state)
+
+        assert execute.call_count == 0
+        assert context.action_results["result"] == "dry run"
+        assert context.action_results["db"] == {"from": "None", "target": "1.2", "applied": "", "remaining": "1.2"}
+
+
+def test_cli_warnings_are_rate_limited(context, state, temporal_admin_container, caplog):
+    stderr = "".join(f"warning {i}\n" for i in range(200))
+    container = dataclasses.replace(
+        temporal_admin_container, execs={ops.testing.Exec(["temporal"], stdout="ok\n", stderr=stderr)}
+    )
+    state = dataclasses.replace(state, containers=[container])
+
+    limiter = exec_log.RateLimiter(rate=1.0, burst=30, clock=lambda: 0.0)
+    with unittest.mock.patch("exec_log._warning_limiter", limiter):
+        state_out = context.run(context.on.action("cli", params={"args": "workflow list"}), state)
+
+    messages = [record.getMessage() for record in caplog.records if record.levelno == logging.WARNING]
+    assert "temporal: warning 0" in messages
+    assert "temporal: warning 29" in messages
+    assert "temporal: warning 30" not in messages
+    # 100 of the 200 lines are omitted by the head and tail, 70 of the rest by the rate limit.
+    assert "temporal: ... 100 lines omitted ..." in messages
+    assert "temporal: 70 warning lines suppressed by rate limit" in messages
+
+    spill = next(record for record in caplog.records if "full output written to" in record.getMessage())
+    path = spill.getMessage().rsplit(" ", 1)[1]
+    filesystem = state_out.get_container("temporal-admin").get_filesystem(context)
+    assert "warning 199\n" in (filesystem / path.lstrip("/")).read_text()
+
+
+def test_spill_files_are_pruned(context, state, temporal_admin_container, tmp_path_factory):
+    spill_dir = tmp_path_factory.mktemp("spill")
+    for i in range(25):
+        stale = spill_dir / f"temporal-20260101T0000{i:02d}Z-stale.log"
+        stale.write_text("old output")
+        os.utime(stale, (1_000_000 + i, 1_000_000 + i))
+
+    container = dataclasses.replace(
+        temporal_admin_container,
+        execs={ops.testing.Exec(["temporal"], stdout="".join(f"line {i}\n" for i in range(200)))},
+        mounts={
+            **temporal_admin_container.mounts,
+            "spill": ops.testing.Mount(location=exec_log.SPILL_DIR, source=spill_dir),
+        },
+    )
+    state = dataclasses.replace(state, containers=[container])
+
+    context.run(context.on.action("cli", params={"args": "workflow list"}), state)
+
+    remaining = sorted(path.name for path in spill_dir.iterdir())
+    assert len(remaining) == exec_log.SPILL_KEEP
+    assert "temporal-20260101T000000Z-stale.log" not in remaining
+    assert "temporal-20260101T000024Z-stale.log" in remaining
+    assert sum(1 for name in remaining if not name.endswith("-stale.log")) == 1
+
+
+@pytest.mark.parametrize("param", ["concurrency", "limit", "discovery-limit"])
+def test_describe_task_queues_rejects_non_positive_params(context, state, param):
+    params = {"namespaces": "", "task-queues": "", "concurrency": 4, "limit": 20, "discovery-limit": 500, param: -1}
+    with unittest.mock.patch("charm.execute") as execute:
+        with pytest.raises(ops.testing.ActionFailed, match="must be positive"):
+            context.run(context.on.action("describe-task-queues", params=params), state)
+
+        assert execute.call_count == 0
+
+
+def test_schema_history_rejects_negative_limit(context, state):
+    with pytest.raises(ops.testing.ActionFailed, match="limit must not be negative"):
+        context.run(context.on.action("schema-history", params={"store": "", "limit": -1}), state)